@@ -1,4 +1,3 @@
-import re
 import json
 import ssl
 
@@ -21,8 +20,6 @@ from adbc.zql import parse_expression, build
 
 
 EMPTY_CLAUSE = {'=': [1, 1]}
-TAGGED_NUMBER_REGEX = re.compile(r'[a-zA-Z]+ ([0-9]+)')
-
 
 
 class PostgresBackend(DatabaseBackend):
@@ -30,6 +27,7 @@ class PostgresBackend(DatabaseBackend):
 
     FUNCTIONS = {
         'array_agg',
+        'string_agg',
     }
     default_schema = 'public'
     dialect = Dialect(
@@ -71,11 +69,13 @@ class PostgresBackend(DatabaseBackend):
         return await connection.fetch(query, *params)
 
     def get_tagged_number(self, value):
-        match = TAGGED_NUMBER_REGEX.match(value)
-        if not match:
-            raise Exception('not a tagged number: {value}')
+        # status tags end with the row count,
+        # e.g. "COPY 42" or "INSERT 0 42"
+        tag, _, number = value.rpartition(' ')
+        if not tag or not number.isdigit():
+            raise ValueError(f'not a tagged number: {value}')
 
-        return int(match.group(1))
+        return int(number)
 
     async def get_tables(self, namespace, scope):
         tables = defaultdict(dict)
@@ -1,4 +1,3 @@
-import re
 import json
 import ssl
 import hashlib
@@ -23,8 +22,6 @@ from adbc.utils import aecho
 
 
 EMPTY_CLAUSE = {'=': [1, 1]}
-TAGGED_NUMBER_REGEX = re.compile(r'[a-zA-Z]+ ([0-9]+)')
-
 
 
 def md5sum(t):
@@ -42,9 +42,7 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
         transaction = aecho()  # connection.transaction() if delete else aecho()
 
         def get_query(q):
-            columns = q.table.order_by_alias(
-                q.table.columns.keys()
-            )
+            columns = q.table.ordered_columns
             q = q.take(*columns)
             if cursor_min:
                 q = q.where({
@@ -67,9 +65,7 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
                         target_query = get_query(target_model)
                         await target_query.delete(connection=connection)
 
-                target_columns = target_model.table.order_by_alias(
-                    target_model.table.columns.keys()
-                )
+                target_columns = target_model.table.ordered_columns
                 # copy from source to buffer
                 source_query = await source_query.get(zql=True)
                 if self.parallel_copy:
@@ -7,6 +7,8 @@ from .executors import get_executor
 class NestedFeature(object):
     """Helper class for Query"""
 
+    __slots__ = ("query", "name", "level")
+
     def __init__(self, query, name, level=None):
         self.query = query
         self.name = name
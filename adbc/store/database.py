@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from cached_property import cached_property
 from pprint import pformat
 from adbc.exceptions import NotIncluded
@@ -155,6 +156,21 @@ class Database(Loggable, WithApply, WithScope):
     def use(self, connection):
         self._connection = connection
 
+    @asynccontextmanager
+    async def acquire(self):
+        """Pins a single connection for a batch of queries
+
+        Queries issued over the same connection can reuse its
+        prepared statement cache
+        """
+        if self._connection:
+            yield self._connection
+            return
+
+        pool = await self.pool
+        async with pool.acquire() as connection:
+            yield connection
+
     async def execute(self, query, params=None, connection=None, transaction=False):
         if isinstance(query, (dict, list)):
             # build zql query
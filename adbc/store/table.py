@@ -4,55 +4,51 @@ import re
 from typing import Union
 from copy import copy
 from collections import defaultdict
+from operator import itemgetter
 from adbc.exceptions import NotIncluded
 from adbc.logging import Loggable
 from adbc.scope import WithScope
 from adbc.generators import G
+from adbc.utils import aecho
 from adbc.constants import SEQUENCE, TABLE, PRIMARY, UNIQUE, FOREIGN
 from cached_property import cached_property
-from adbc.utils import get_first
 
+by_name = itemgetter("name")
+KEY_TYPES = {PRIMARY, UNIQUE, FOREIGN}
 
 
-def get_fks(constraints):
-    """Get foreign key fields given constraint list"""
+def get_keys(constraints):
+    """Get primary, unique and foreign key fields given constraint list
+
+    Only single-column constraints are considered.
+    Constraints are scanned once for all three key types.
+
+    Returns:
+        tuple of dicts: (pks, uniques, fks)
+    """
+    pks = {}
+    uniques = {}
     fks = {}
 
     if constraints:
         for name, constraint in constraints.items():
-            if constraint['type'] == FOREIGN and len(constraint['columns']) == 1:
-                column = constraint['columns'][0]
+            type = constraint['type']
+            if type not in KEY_TYPES or len(constraint['columns']) != 1:
+                # e.g. check constraints, multi-column constraints
+                continue
+            column = constraint['columns'][0]
+            if type == PRIMARY:
+                pks[column] = name
+            elif type == UNIQUE:
+                uniques[column] = name
+            else:
                 fks[column] = {
                     'to': constraint['related_name'],
                     'by': constraint['related_columns'],
                     'name': name
                 }
 
-    return fks
-
-
-def get_pks(constraints):
-    """Get primary key(s) given constraint list"""
-    pks = {}
-
-    if constraints:
-        for name, constraint in constraints.items():
-            if constraint['type'] == PRIMARY and len(constraint['columns']) == 1:
-                column = constraint['columns'][0]
-                pks[column] = name
-
-    return pks
-
-
-def get_uniques(constraints):
-    """Get unique key(s) given constraint list"""
-    uniques = {}
-    if constraints:
-        for name, constraint in constraints.items():
-            if constraint["type"] == UNIQUE and len(constraint['columns']) == 1:
-                column = constraint['columns'][0]
-                uniques[column] = name
-    return uniques
+    return pks, uniques, fks
 
 
 class Table(WithScope, Loggable):
@@ -130,9 +126,10 @@ class Table(WithScope, Loggable):
         # - unique: based on unique constraints
         # - related: based on foreign key constraints
         constraints = self.constraints
-        self.pks = get_pks(constraints) or {}
-        uniques = self.uniques = get_uniques(constraints)
-        fks = self.fks = get_fks(constraints)
+        pks, uniques, fks = get_keys(constraints)
+        self.pks = pks
+        self.uniques = uniques
+        self.fks = fks
         for name, column in self.columns.items():
             if "default" in column:
                 default = column['default'] = self.backend.parse_expression(
@@ -231,7 +228,13 @@ class Table(WithScope, Loggable):
         if type:
             type = set(type)
 
-        for child in sorted(children, key=lambda c: translate(c["name"])):
+        if translation:
+            order = lambda c: translate(c["name"])
+        else:
+            # no aliases: sort by real name
+            order = by_name
+
+        for child in sorted(children, key=order):
             if type and child['type'] not in type:
                 # ignore on request
                 continue
@@ -373,24 +376,33 @@ class Table(WithScope, Loggable):
 
         cursor = None
         hashes = {}
-        while True:
-            stats = await self.get_statistics(
-                cursor=cursor,
-                limit=shard_size,
-                count=True,
-                max_pk=True,
-                min_pk=True,
-                md5=True,
-            )
-            min_pk = stats["min"]
-            max_pk = stats["max"]
-            count = stats["count"]
-            md5 = stats["md5"]
-            if count and md5:
-                hashes[min_pk] = md5
-            cursor = max_pk
-            if count < shard_size:
-                break
+        # run every shard over one connection:
+        # the shard query text is the same each time (the cursor is a parameter)
+        # so it is only parsed and planned once
+        # split statistics (UUID pks) run their queries concurrently instead,
+        # each on its own connection; holding one here while they wait
+        # for more can exhaust the pool
+        connection = aecho() if self.uuid_pk else self.database.acquire()
+        async with connection as connection:
+            while True:
+                stats = await self.get_statistics(
+                    cursor=cursor,
+                    limit=shard_size,
+                    count=True,
+                    max_pk=True,
+                    min_pk=True,
+                    md5=True,
+                    connection=connection,
+                )
+                min_pk = stats["min"]
+                max_pk = stats["max"]
+                count = stats["count"]
+                md5 = stats["md5"]
+                if count and md5:
+                    hashes[min_pk] = md5
+                cursor = max_pk
+                if count < shard_size:
+                    break
 
         return hashes
 
@@ -402,58 +414,32 @@ class Table(WithScope, Loggable):
         md5=False,
         limit=None,
         cursor=None,
+        connection=None,
     ):
-        split = False
-        if (min_pk or max_pk) and (md5 or count):
-            # may need to split up this query
-            # if the pk is a UUID then min_pk and max_pk have to run separately
-            if self.pk:
-                pk = self.pk
-                split = self.columns[pk]["type"] == "uuid"
+        # may need to split up this query
+        # if the pk is a UUID then min_pk and max_pk have to run separately
+        split = (min_pk or max_pk) and (md5 or count) and self.uuid_pk
         if split:
             # split query:
-            # call this function several times with reduced parameter set
-            kwargs["min_pk"] = False
-            kwargs["max_pk"] = False
-
+            # call this function again with reduced parameter set
+            # and get min/max separately, all running in parallel
+            # a single connection cannot run queries concurrently,
+            # so any pinned connection is not used here
+            jobs = {}
             if md5 or count:
-                md5 = self.get_statistics(**kwargs)
-            else:
-                md5 = False
-            if min_pk:
-                min_pk = self.get_min_id(cursor=cursor, limit=limit)
-            if max_pk:
-                max_pk = self.get_max_id(cursor=cursor, limit=limit)
-
-            tasks = []
-            if md5:
-                tasks.append(md5)
-            if min_pk:
-                tasks.append(min_pk)
-            if max_pk:
-                tasks.append(max_pk)
-
-            results = await gather(*tasks)
-            i = 0
-
-            if md5:
-                md5 = results[i]
-                i += 1
+                jobs["stats"] = self.get_statistics(
+                    count=count, md5=md5, limit=limit, cursor=cursor
+                )
             if min_pk:
-                min_pk = results[i]
-                i += 1
-
+                jobs["min"] = self.get_min_id(cursor=cursor, limit=limit)
             if max_pk:
-                max_pk = results[i]
-                i += 1
+                jobs["max"] = self.get_max_id(cursor=cursor, limit=limit)
 
-            result = {}
-            if md5:
-                result.update(md5.items())
-            if min_pk:
-                result["min"] = min_pk
-            if max_pk:
-                result["max"] = max_pk
+            results = await asyncio.gather(*jobs.values())
+            results = dict(zip(jobs.keys(), results))
+            stats = results.pop("stats", None)
+            result = dict(stats.items()) if stats else {}
+            result.update(results)
             return result
 
         else:
@@ -465,7 +451,9 @@ class Table(WithScope, Loggable):
                 count=count,
                 md5=md5,
             )
-            result = await self.database.query_one_row(query)
+            result = await self.database.query_one_row(
+                query, connection=connection
+            )
             return result
 
     def order_by_alias(self, columns):
@@ -474,6 +462,19 @@ class Table(WithScope, Loggable):
             key=lambda c: self.columns[c].get('alias', c)
         )
 
+    @cached_property
+    def uuid_pk(self):
+        """Whether the table has a single UUID primary key"""
+        return bool(self.pk) and self.columns[self.pk]["type"] == "uuid"
+
+    @cached_property
+    def ordered_columns(self):
+        return self.order_by_alias(sorted(self.columns.keys()))
+
+    @cached_property
+    def ordered_pks(self):
+        return self.order_by_alias(self.pks)
+
     async def get_statistics_query(
         self,
         count=False,
@@ -487,16 +488,12 @@ class Table(WithScope, Loggable):
         if not count and not max_pk and not md5 and not min_pk:
             raise Exception("must pass count or max_pk or md5 or min_pk")
 
-        columns = list(sorted(self.columns.keys()))
-        pks = self.order_by_alias(self.pks)
+        pks = self.ordered_pks
         order = pks
 
-        if not md5:
-            columns = pks
-
         # TODO: use alias ordering to ensure consistent
         # hashes across datastores with different schematic names
-        columns = self.order_by_alias(columns)
+        columns = self.ordered_columns if md5 else pks
         # concatenate values together 
         aggregate = [f"T.{c}" for c in columns]
         aggregate = {'json_build_array': aggregate}
@@ -505,19 +502,23 @@ class Table(WithScope, Loggable):
         pk = pks[0]
 
         if md5:
-            if self.backend.has_function('array_agg'):
+            # hash each row and then hash the row digests together
+            # this way the aggregate holds one fixed-size digest per row
+            # rather than the full text of every row
+            if self.backend.has_function('string_agg'):
+                # string_agg streams into one buffer,
+                # without materializing an intermediate array
+                digest = {'md5': {'concat': aggregate}}
                 md5 = {
                     'md5': {
-                        'array_to_string': [
-                            {'array_agg': aggregate},
-                            '`,`'
-                        ]
+                        'string_agg': [digest, '`,`']
                     }
                 }
             else:
+                digest = {'md5': aggregate}
                 md5 = {
                     'md5': {
-                        'group_concat': aggregate
+                        'group_concat': digest
                     }
                 }
 
@@ -535,7 +536,8 @@ class Table(WithScope, Loggable):
 
         where = None
         if cursor:
-            where = {'>': [pk, cursor]}
+            # pass the cursor as a parameter to keep the query text constant
+            where = {'>': [pk, {'literal': cursor}]}
 
         query = {
             'select': {
@@ -562,7 +564,7 @@ class Table(WithScope, Loggable):
         if not field:
             raise ValueError(f'table {self.full_name} has no primary key')
 
-        order = {'by': field, 'desc': max}
+        order = {'by': field, 'ascending': not max}
         if limit is None and cursor is None:
             return {
                 'select': {
@@ -575,7 +577,7 @@ class Table(WithScope, Loggable):
 
         where = None
         if cursor:
-            where = {'>': [field, cursor]}
+            where = {'>': [field, {'literal': cursor}]}
         query = {
             'select': {
                 'data': f'T.{field}',
@@ -608,6 +610,11 @@ class Table(WithScope, Loggable):
             }
         }
 
+    @cached_property
+    def count_query(self):
+        # the count query never changes, build it once
+        return self.backend.build(self.get_count_query())[0]
+
     def get_range_query(self, keys):
         data = []
         for key in keys:
@@ -677,10 +684,12 @@ class Table(WithScope, Loggable):
         query = self.get_edge_query(max=True, limit=limit, cursor=cursor, field=pk)
         return await self.database.query_one_value(query)
 
-    async def get_count(self):
-        query = self.get_count_query()
-        return await self.database.query_one_value(query)
+    async def get_count(self, connection=None):
+        query, params = self.count_query
+        return await self.database.query_one_value(
+            query, params, connection=connection
+        )
 
     @cached_property
     async def count(self):
-        return self.get_count()
+        return await self.get_count()
@@ -1,5 +1,6 @@
 import re
 import copy
+from functools import lru_cache
 from adbc.utils import get
 
 
@@ -11,6 +12,19 @@ def get_context_variables(value):
     return [match.group(1).strip() for match in FORMAT_STRING_REGEX.finditer(value)]
 
 
+@lru_cache(maxsize=256)
+def get_template_variables(value):
+    """Get (start, end, path) of each context variable inside string value
+
+    Results are cached per template string, the same templates
+    are resolved over and over again with different contexts
+    """
+    return tuple(
+        (match.start(), match.end(), match.group(1).strip())
+        for match in FORMAT_STRING_REGEX.finditer(value)
+    )
+
+
 def resolve_template(value, context=None, null=Exception):
     if not isinstance(value, str):
         return value
@@ -27,10 +41,7 @@ def resolve_template(value, context=None, null=Exception):
     results = None
     read = 0
     value_len = len(value)
-    for match in FORMAT_STRING_REGEX.finditer(value):
-        start = match.start()
-        end = match.end()
-        path = match.group(1).strip()
+    for start, end, path in get_template_variables(value):
         null = Exception
         if path.endswith('?'):
             null = ''
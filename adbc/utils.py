@@ -156,6 +156,8 @@ def split_field(i, f):
 
 
 class AsyncContext(object):
+    __slots__ = ("args",)
+
     def __init__(self, args=None):
         self.args = args
 
@@ -1,3 +1,4 @@
+from types import MappingProxyType
 from adbc.zql.validator import Validator
 
 
@@ -22,7 +23,7 @@ class Builder(Validator):
         'set'
     }
     OPERATOR_REWRITES = {}
-    OPERATORS = {
+    OPERATORS = MappingProxyType({
         'not': 1,
         '!!': 1,
         'is': 2,
@@ -56,7 +57,6 @@ class Builder(Validator):
         '||': 2,
         '<': 2,
         '<=': 2,
-        '-': 2,
         '!=': 2,
         '<>': 2,
         'like': 2,
@@ -67,7 +67,7 @@ class Builder(Validator):
         '>=': 2,
         'and': 2,
         'or': 2,
-    }
+    })
     # TODO: handle non-functional clause expressions
     # like CASE, BETWEEN, etc
     CLAUSES = {
@@ -3,14 +3,43 @@ import re
 import copy
 import datetime
 from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
 from typing import List, Union, Optional
 from .core import Builder
 from adbc.generators import G
-from adbc.utils import flatten
+from adbc.utils import flatten, cached_property
 
 # from .statements import Select, ...
 
 
+# identifiers, literals and NULL
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# only alphanumeric, _, and .
+# first letter must be alpha
+FUNCTION_REGEX = re.compile(r"^[A-Za-z][A-Za-z0-9_.]*$")
+TYPE_REGEX = re.compile(r"^[a-zA-Z][A-Za-z0-9\[\] ]*")
+KEYWORD_REGEX = re.compile(r"^[A-Za-z][A-Za-z_]*$")
+
+
+# function, type and keyword names come from a small, closed set
+# so validation results are memoized per name
+@lru_cache(maxsize=4096)
+def is_function(name):
+    return FUNCTION_REGEX.match(name) is not None
+
+
+@lru_cache(maxsize=4096)
+def is_type(name):
+    return TYPE_REGEX.match(name) is not None
+
+
+@lru_cache(maxsize=4096)
+def is_keyword(name):
+    return KEYWORD_REGEX.match(name) is not None
+
+
 def add_key(d, k, v):
     d = copy.copy(d)
     d[k] = v
@@ -23,6 +52,18 @@ class SQLBuilder(Builder):
     AUTOINCREMENT = None
     INLINE_PRIMARY_KEYS = False
     OPERATOR_RENAMES = {}
+    LOGICAL_OPERATORS = {"and", "or", "not"}
+    MAX_CACHED_INDENT = 32
+    # pattern-matching operators rewritten to (i)like:
+    # operator -> (rewrite, pattern prefix, pattern suffix)
+    WILDCARD_OPERATORS = {
+        "contains": ("like", "%", "%"),
+        "icontains": ("ilike", "%", "%"),
+        "startswith": ("like", "", "%"),
+        "istartswith": ("ilike", "", "%"),
+        "endswith": ("like", "%", ""),
+        "iendswith": ("ilike", "%", ""),
+    }
     FUNCTION_RENAMES = {}
     CONSTRAINT_ABBREVIATIONS = {
         "primary": "pk",
@@ -379,12 +420,7 @@ class SQLBuilder(Builder):
         )
 
         if columns:
-            columns = self.parens(
-                self.combine(
-                    [self.format_identifier(column) for column in columns],
-                    separator=', '
-                )
-            )
+            columns = self.parens(self.format_identifiers(columns))
 
         values = self.get_values(values, style, params=params, depth=depth)
         # Returning: Postgres-only
@@ -820,7 +856,11 @@ class SQLBuilder(Builder):
         if isinstance(group, list):
             group = self.combine(
                 [
-                    self.get_select_group(g, style, params, depth=depth, prefix=False)
+                    self.format_identifier(g)
+                    if isinstance(g, str)
+                    else self.get_select_group(
+                        g, style, params, depth=depth, prefix=False
+                    )
                     for g in group
                 ],
                 separator=", ",
@@ -879,7 +919,11 @@ class SQLBuilder(Builder):
         if isinstance(order, list):
             order = self.combine(
                 [
-                    self.get_select_order(o, style, params, depth=depth, prefix=False)
+                    self.format_identifier(o)
+                    if isinstance(o, str)
+                    else self.get_select_order(
+                        o, style, params, depth=depth, prefix=False
+                    )
                     for o in order
                 ],
                 separator=", ",
@@ -914,7 +958,15 @@ class SQLBuilder(Builder):
         offset = int(offset)
         return f"{indent}OFFSET {offset}"
 
+    @cached_property
+    def indents(self):
+        """Indentation strings by depth, rendered once per builder"""
+        unit = self.WHITESPACE_CHARACTER * self.INDENT
+        return tuple(unit * depth for depth in range(self.MAX_CACHED_INDENT))
+
     def get_indent(self, depth=0):
+        if 0 <= depth < self.MAX_CACHED_INDENT:
+            return self.indents[depth]
         return self.WHITESPACE_CHARACTER * self.INDENT * depth
 
     def build_delete(
@@ -967,9 +1019,7 @@ class SQLBuilder(Builder):
             # in PreQL: ["a", "b", "c", subquery]
             subquery = clause[-1]
             columns = clause[0:-1]
-            columns = self.combine(
-                [self.format_identifier(c) for c in columns], separator=", "
-            )
+            columns = self.format_identifiers(columns)
             subquery = self.get_subquery(subquery, style, params, depth=depth)
             result = f"({columns}) = (\n{subquery}\n{indent})"
         return f"{indent}{result}"
@@ -1011,9 +1061,7 @@ class SQLBuilder(Builder):
             if not isinstance(from_, list):
                 from_ = [from_]
             # TODO: support update with subquery in FROM
-            from_ = self.combine(
-                [self.format_identifier(f) for f in from_], separator=", "
-            )
+            from_ = self.format_identifiers(from_)
             from_ = f"FROM {from_}"
 
         if where:
@@ -1033,7 +1081,7 @@ class SQLBuilder(Builder):
     def escape_literal(self, literal):
         quote = self.LITERAL_QUOTE_CHARACTER
         if quote in literal:
-            literal = re.sub(quote, f"{quote}{quote}", literal)
+            literal = literal.replace(quote, f"{quote}{quote}")
         return f"{quote}{literal}{quote}"
 
     def escape_identifier(self, identifier: Union[list, str]):
@@ -1047,7 +1095,7 @@ class SQLBuilder(Builder):
 
         # escape by doubling quote character
         # TODO: make this configurable?
-        identifier = re.sub(quote, f"{quote}{quote}", identifier)
+        identifier = identifier.replace(quote, f"{quote}{quote}")
         return identifier
 
     def unpack_identifier(self, identifier: Union[list, str, dict]):
@@ -1067,12 +1115,27 @@ class SQLBuilder(Builder):
         return identifier
 
     def format_identifier(self, identifier: Union[list, str, dict]):
+        if isinstance(identifier, str):
+            return self.format_string_identifier(identifier)
+        return self.quote_identifier(identifier)
+
+    @cached_property
+    def format_string_identifier(self):
+        # identifiers (schema, table, column names) are a small set
+        # that is formatted over and over, memoize them per builder
+        return lru_cache(maxsize=16384)(self.quote_identifier)
+
+    def quote_identifier(self, identifier: Union[list, str, dict]):
         identifier = self.unpack_identifier(identifier)
         quote = self.IDENTIFIER_QUOTE_CHARACTER
         return self.combine(
             [f"{quote}{ident}{quote}" for ident in identifier], separator="."
         )
 
+    def format_identifiers(self, identifiers: list, separator: str = ", "):
+        """Format and join a list of identifiers"""
+        return separator.join(map(self.format_identifier, identifiers))
+
     def build_create_database(
         self, clause: str, style: ParameterStyle, depth: int = 0, params=None
     ) -> List[tuple]:
@@ -1326,9 +1389,7 @@ class SQLBuilder(Builder):
             name = f" {name}"
         unique = " UNIQUE " if clause.get("unique") else " "
         if columns:
-            expression = self.combine(
-                [self.format_identifier(c) for c in columns], separator=", "
-            )
+            expression = self.format_identifiers(columns)
         elif expression:
             expression = self.get_expression(
                 expression, style, params, depth=depth, allow_subquery=False
@@ -1636,25 +1697,55 @@ class SQLBuilder(Builder):
     def is_command(self, name):
         return name in self.COMMANDS
 
-    def get_operator(self, name):
-        return self.OPERATORS.get(name, None)
+    def compile_operator(self, name: str, operator: Union[int, dict]):
+        """Compiles an operator into a formatter function
+
+        The formatter takes a list of formatted arguments
+        and returns the formatted operator expression
+        """
+        separator = f" {name} "
+        prefix = f"{name} "
+        suffix = f" {name}"
+        # most operators bind left, some bind right
+        right = isinstance(operator, dict) and operator.get("binds") == "right"
+
+        def format_operator(arguments):
+            if len(arguments) > 1:
+                # e.g. {"+": [1, 2]} -> 1 + 2
+                return separator.join(arguments)
+            # e.g. {"not": ...} -> not ...
+            argument = arguments[0]
+            return f"{argument}{suffix}" if right else f"{prefix}{argument}"
+
+        return format_operator
+
+    @cached_property
+    def operator_formatters(self) -> dict:
+        """Operator formatters, keyed by (pre-rename) operator name
+
+        Built once per builder so that expressions do not have to
+        resolve renames, binding and separators on every operator
+        """
+        formatters = {}
+        for name, operator in self.OPERATORS.items():
+            formatters[name] = self.compile_operator(name, operator)
+        for name, rename in self.OPERATOR_RENAMES.items():
+            if rename in self.OPERATORS:
+                # alias: share the formatter of the renamed operator
+                formatters[name] = formatters[rename]
+            else:
+                # renamed to a function
+                formatters.pop(name, None)
+        return MappingProxyType(formatters)
 
     def validate_function(self, name):
-        # only alphanumeric, _, and .
-        # first letter must be alpha
-        if re.match(r"^[A-Za-z][A-Za-z0-9_.]*$", name):
-            return True
-        return False
+        return is_function(name)
 
     def validate_type(self, name):
-        if re.match(r"^[a-zA-Z][A-Za-z0-9\[\] ]*", name):
-            return True
-        return False
+        return is_type(name)
 
     def validate_keyword(self, name):
-        if re.match(r"^[A-Za-z][A-Za-z_]*$", name):
-            return True
-        return False
+        return is_keyword(name)
 
     def get_between_expression(
         self, value, style, params, allow_subquery=False, depth=0,
@@ -1686,20 +1777,22 @@ class SQLBuilder(Builder):
         )
         if isinstance(right, list):
             # X in (A, B, ...)
-            subs = [
-                self.get_expression(
+            # joined in one pass, these lists can be long
+            subs = ", ".join(
+                self.get_scalar_expression(r, style, params)
+                if isinstance(r, SCALAR_TYPES)
+                else self.get_expression(
                     r, style, params, allow_subquery=allow_subquery, depth=0
                 )
                 for r in right
-            ]
-            subs = self.combine(subs, separator=", ")
+            )
             return f"{indent}{left} IN ({subs})"
         else:
             # X IN (SELECT ...)
             sub = self.get_expression(
                 right, style, params, allow_subquery=allow_subquery, depth=depth + 1
             )
-            return f"{indent}{left} IN (\n{subs}\n{indent})"
+            return f"{indent}{left} IN (\n{sub}\n{indent})"
 
     def get_case_expression(
         self, cases, style, params, allow_subquery=True, depth=0, indent=False
@@ -1751,6 +1844,130 @@ class SQLBuilder(Builder):
             else_ = ""
         return f"CASE {whens}{else_} END"
 
+    def get_scalar_expression(
+        self,
+        expression: Union[str, int, float, bool, None],
+        style: ParameterStyle,
+        params: Union[dict, list],
+        raw=False,
+    ) -> str:
+        """Gets a scalar expression: identifier, literal or NULL
+
+        This is the common case for operator arguments (e.g. {"=": ["id", 1]})
+        and is handled without the indentation/nesting logic of get_expression
+        """
+        if expression is None:
+            return "NULL"
+
+        if not isinstance(expression, str):
+            # literal, cast to string
+            return str(expression)
+
+        if expression == self.WILDCARD_CHARACTER:
+            return expression
+        if (
+            len(expression) > 1
+            and expression[0] == expression[-1]
+            and expression[0] in self.QUOTE_CHARACTERS
+        ):
+            # if quotes with ' or " or ` assume this is a literal
+            result = expression[1:-1]
+            if expression[0] == self.RAW_QUOTE_CHARACTER or raw:
+                # add inline
+                return self.escape_literal(result)
+            # add as parameter
+            return self.add_parameter(result, style, params)
+
+        # if unquoted, always assume an identifier
+        return self.format_identifier(expression)
+
+    def get_logical_key(self, expression) -> Optional[str]:
+        """Returns the operator of a logical expression, if it is one"""
+        if not isinstance(expression, dict) or len(expression) != 1:
+            return None
+        key, value = next(iter(expression.items()))
+        if value is None:
+            # keyword expression
+            return None
+        key = key.lower()
+        return key if key in self.LOGICAL_OPERATORS else None
+
+    def get_logical_expression(
+        self,
+        key: str,
+        value,
+        style: ParameterStyle,
+        params: Union[dict, list],
+        allow_subquery: bool = True,
+        raw=False,
+        depth: int = 0,
+    ) -> str:
+        """Gets a (nested) logical expression: and, or, not
+
+        Filters can nest these deeply, so the tree is walked
+        with an explicit stack instead of recursing into get_expression
+        for every level; other operands are formatted as usual
+
+        Tokens are appended to a single output list and joined once,
+        rather than joining and parenthesizing a string at every level
+        """
+        out = []
+        # stack items are either tokens (str) to emit as-is
+        # or operands (tuple) to format: (logical operator or None, value)
+        stack = [(key, value)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                out.append(item)
+                continue
+
+            operator, operand = item
+            if operator is None:
+                # not a logical expression, format as usual
+                if isinstance(operand, SCALAR_TYPES):
+                    out.append(
+                        self.get_scalar_expression(operand, style, params, raw=raw)
+                    )
+                else:
+                    out.append(
+                        self.get_expression(
+                            operand,
+                            style,
+                            params,
+                            allow_subquery=allow_subquery,
+                            raw=raw,
+                            indent=False,
+                            parens=True,
+                            depth=depth,
+                        )
+                    )
+                continue
+
+            operands = operand if isinstance(operand, list) else [operand]
+            if not operands:
+                raise ValueError(f"{operator}: must have at least one argument")
+
+            # push tokens in reverse so that they pop in order
+            # e.g. {"and": [a, {"or": [b, c]}]} -> a and (b or c)
+            separator = f" {operator} "
+            last = len(operands) - 1
+            for index in range(last, -1, -1):
+                operand = operands[index]
+                child = self.get_logical_key(operand)
+                if child:
+                    stack.append(")")
+                    stack.append((child, next(iter(operand.values()))))
+                    stack.append("(")
+                else:
+                    stack.append((None, operand))
+                if index:
+                    stack.append(separator)
+            if not last:
+                # unary, e.g. {"not": a} -> not a
+                stack.append(f"{operator} ")
+
+        return "".join(out)
+
     def get_expression(
         self,
         expression,
@@ -1762,10 +1979,9 @@ class SQLBuilder(Builder):
         raw=False,
         depth: int = 0,
     ) -> str:
-        indent = self.get_indent(depth if indent else 0)
-        if isinstance(expression, (int, float, bool)):
-            # literal, cast to string
-            result = str(expression)
+        indent = self.get_indent(depth) if indent and depth else ""
+        if isinstance(expression, SCALAR_TYPES):
+            result = self.get_scalar_expression(expression, style, params, raw=raw)
             return f"{indent}{result}"
 
         if isinstance(expression, (datetime.date, datetime.time, datetime.datetime)):
@@ -1775,37 +1991,11 @@ class SQLBuilder(Builder):
             result = self.add_parameter(expression, style, params)
             return f"{indent}{result}"
 
-        if expression is None:
-            return f"{indent}NULL"
-
         if isinstance(expression, list):
             # assume identifier list
             result = self.format_identifier(expression)
             return f"{indent}{result}"
 
-        if isinstance(expression, str):
-            if expression == self.WILDCARD_CHARACTER:
-                return f"{indent}{expression}"
-            if (
-                len(expression) > 1
-                and expression[0] == expression[-1]
-                and expression[0] in self.QUOTE_CHARACTERS
-            ):
-                # if quotes with ' or " or ` assume this is a literal
-                char = expression[0]
-                result = expression[1:-1]
-                if expression[0] == self.RAW_QUOTE_CHARACTER or raw:
-                    # add inline
-                    result = self.escape_literal(result)
-                else:
-                    # add as parameter
-                    result = self.add_parameter(result, style, params)
-                return f"{indent}{result}"
-            else:
-                # if unquoted, always assume an identifier
-                result = self.format_identifier(expression)
-                return f"{indent}{result}"
-
         lp = "(" if parens else ""
         rp = ")" if parens else ""
         if isinstance(expression, dict):
@@ -1832,81 +2022,74 @@ class SQLBuilder(Builder):
                     subquery = self.get_subquery(expression, style, params, depth=depth)
                     return f"{indent}{subquery}"
 
+                if key in self.LOGICAL_OPERATORS:
+                    # e.g. {"and": [{"or": [...]}, {"not": ...}]}
+                    result = self.get_logical_expression(
+                        key,
+                        value,
+                        style,
+                        params,
+                        allow_subquery=allow_subquery,
+                        raw=raw,
+                        depth=depth,
+                    )
+                    return f"{indent}{lp}{result}{rp}"
+
                 # operator/function remapping
-                if key == "contains" or key == "icontains":
-                    # (i)contains -> (i)like
-                    key = "like" if key == "contains" else "ilike"
-                    assert len(value) == 2
-                    value1 = value[1]
+                wildcard = self.WILDCARD_OPERATORS.get(key)
+                if wildcard:
+                    # e.g. {"contains": ["a", "'c'"]} -> {"like": ["a", "'%c%'"]}
+                    if len(value) != 2:
+                        raise ValueError(f"{key}: must have two arguments")
+                    key, prefix, suffix = wildcard
+                    left, right = value
                     if (
-                        isinstance(value1, str)
-                        and value1
-                        and value1[0] in self.QUOTE_CHARACTERS
+                        isinstance(right, str)
+                        and right
+                        and right[0] in self.QUOTE_CHARACTERS
                     ):
                         # literal
-                        quote = value1[0]
-                        new_value = value1[1:-1]
-                        new_value = f"{quote}%{new_value}%{quote}"
-                        value[1] = new_value
+                        quote = right[0]
+                        right = f"{quote}{prefix}{right[1:-1]}{suffix}{quote}"
                     else:
-                        # identifier
-                        value[1] = {"concat": ["%", value1, "%"]}
-                    # {"contains": ["a", "'c'"]}
-                    # -> {"like": ["a", "'%c%'"]}
-
-                if key in self.OPERATOR_RENAMES:
-                    key = self.OPERATOR_RENAMES[key]
-
-                operator = self.get_operator(key)
-                if operator:
+                        # identifier or expression
+                        parts = [right]
+                        if prefix:
+                            parts.insert(0, f"`{prefix}`")
+                        if suffix:
+                            parts.append(f"`{suffix}`")
+                        right = {"concat": parts}
+                    value = [left, right]
+
+                formatter = self.operator_formatters.get(key)
+                if formatter:
                     # operator expression, e.g. {"+": [1, 2]} -> 1 + 2
                     if not isinstance(value, list):
                         # dict -> [dict]
                         value = [value]
 
-                    num_args = len(value)
-                    if num_args > 1:
-                        result = self.combine(
-                            [
-                                self.get_expression(
-                                    arg,
-                                    style,
-                                    params,
-                                    allow_subquery=allow_subquery,
-                                    raw=raw,
-                                    indent=False,
-                                    parens=True,
-                                    depth=depth,
-                                )
-                                for arg in value
-                            ],
-                            separator=f" {key} ",
-                        )
-                        return f"{indent}{lp}{result}{rp}"
-                    else:
-                        # e.g. {"not": ...}
-                        expression = self.get_expression(
-                            value[0],
-                            style,
-                            params,
-                            allow_subquery=allow_subquery,
-                            raw=raw,
-                            indent=False,
-                            parens=True,
-                            depth=depth,
-                        )
-                        left = True
-                        if (
-                            isinstance(operator, dict)
-                            and operator.get("binds") == "right"
-                        ):
-                            # most operators bind left, some bind right
-                            left = False
-                        return (
-                            f"{indent}{lp}{key} {expression}{rp}"
-                            if left
-                            else f"{indent}{lp}{expression} {key}{rp}"
-                        )
+                    result = formatter(
+                        [
+                            # fast path for scalar arguments
+                            self.get_scalar_expression(arg, style, params, raw=raw)
+                            if isinstance(arg, SCALAR_TYPES)
+                            else self.get_expression(
+                                arg,
+                                style,
+                                params,
+                                allow_subquery=allow_subquery,
+                                raw=raw,
+                                indent=False,
+                                parens=True,
+                                depth=depth,
+                            )
+                            for arg in value
+                        ]
+                    )
+                    return f"{indent}{lp}{result}{rp}"
+
+                if key in self.OPERATOR_RENAMES:
+                    key = self.OPERATOR_RENAMES[key]
 
                 # special cases
                 if key == "case":
@@ -2036,9 +2219,7 @@ class SQLBuilder(Builder):
             if "columns" not in constraint:
                 raise ValueError(f'{type} constraint: "{name}" must have: "columns"')
             columns = constraint["columns"]
-            columns = self.combine(
-                [self.format_identifier(c) for c in columns], separator=", "
-            )
+            columns = self.format_identifiers(columns)
             columns = f" ({columns})"
 
         related = ""
@@ -2051,9 +2232,7 @@ class SQLBuilder(Builder):
                 )
 
             related_name = self.get_references_identifier(related_name)
-            related_columns = self.combine(
-                [self.format_identifier(c) for c in related_columns], separator=", "
-            )
+            related_columns = self.format_identifiers(related_columns)
             related = f" REFERENCES {related_name} ({related_columns})"
 
         deferrable = constraint.get("deferrable", False)
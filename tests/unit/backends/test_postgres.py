@@ -0,0 +1,18 @@
+import pytest
+from adbc.backends.postgres import PostgresBackend
+
+
+def test_get_tagged_number():
+    backend = PostgresBackend()
+    expectations = [
+        ('COPY 42', 42),
+        # INSERT tags include the OID before the row count
+        ('INSERT 0 42', 42),
+        ('DELETE 0', 0),
+    ]
+    for value, expected in expectations:
+        assert expected == backend.get_tagged_number(value)
+
+    for value in ('COPY', 'COPY many', ''):
+        with pytest.raises(ValueError):
+            backend.get_tagged_number(value)
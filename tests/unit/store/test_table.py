@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from adbc.store import Database
+from adbc.store.table import Table
+from adbc.backends.postgres import PostgresBackend
+from adbc.zql import build
+from adbc.zql.dialect import Dialect, Backend, ParameterStyle
+
+
+def get_dialect():
+    return Dialect(
+        backend=Backend.POSTGRES, style=ParameterStyle.FORMAT
+    )
+
+
+def get_table(name='test', namespace=None):
+    return Table(
+        name,
+        namespace=namespace or SimpleNamespace(name='public'),
+        columns=[
+            {'name': 'id', 'type': 'uuid', 'primary': True},
+            {'name': 'name', 'type': 'text'}
+        ],
+        backend=PostgresBackend()
+    )
+
+
+class FakePool(object):
+    """Pool with a fixed number of connections"""
+
+    def __init__(self, size):
+        self.connections = asyncio.Semaphore(size)
+
+    def acquire(self):
+        return FakeConnection(self.connections)
+
+
+class FakeConnection(object):
+    def __init__(self, connections):
+        self.connections = connections
+
+    async def __aenter__(self):
+        await self.connections.acquire()
+        return self
+
+    async def __aexit__(self, *args):
+        self.connections.release()
+
+
+class FakeBackend(PostgresBackend):
+    async def fetch(self, connection, query, params=None):
+        await asyncio.sleep(0)
+        if 'count(*)' in query:
+            # statistics: empty shard
+            return [{'md5': None, 'count': 0}]
+        # edge
+        return [(None, )]
+
+
+def test_edge_query():
+    dialect = get_dialect()
+    table = get_table()
+    expectations = [
+        (
+            table.get_edge_query(max=True, limit=10, cursor='abc'),
+            [(
+                'SELECT "T"."id"\n'
+                'FROM (\n'
+                '    SELECT "id"\n'
+                '    FROM "public"."test"\n'
+                '    WHERE "id" > %s\n'
+                '    ORDER BY "id"\n'
+                '    LIMIT 10\n'
+                ') AS "T"\n'
+                'ORDER BY "id" DESC\n'
+                'LIMIT 1', ['abc']
+            )]
+        ), (
+            table.get_edge_query(max=True),
+            [(
+                'SELECT "id"\n'
+                'FROM "public"."test"\n'
+                'ORDER BY "id" DESC\n'
+                'LIMIT 1', []
+            )]
+        ), (
+            table.get_edge_query(max=False),
+            [(
+                'SELECT "id"\n'
+                'FROM "public"."test"\n'
+                'ORDER BY "id"\n'
+                'LIMIT 1', []
+            )]
+        )
+    ]
+    for query, expected in expectations:
+        result = build(query, dialect=dialect)
+        assert expected == result
+
+
+@pytest.mark.asyncio
+async def test_get_hashes_uuid_pool():
+    # hashing more UUID-keyed tables than there are pool connections
+    # must not hold connections while waiting for others
+    database = Database(name='test', max_pool_size=2)
+    database._pool = FakePool(2)
+    database.__dict__['backend'] = FakeBackend()
+    namespace = SimpleNamespace(name='public', database=database)
+    tables = [get_table(f'test{i}', namespace=namespace) for i in range(5)]
+    hashes = asyncio.gather(*[table.get_hashes(shard_size=10) for table in tables])
+    assert [{}] * 5 == await asyncio.wait_for(hashes, timeout=5)
@@ -350,6 +350,53 @@ def test_build_delete():
                 'WHERE "name" = %s\n'
                 'RETURNING "id", "name"', ['foo']
             )]
+        ), (
+            {
+                "delete": {
+                    "table": "test",
+                    "where": {
+                        "in": ["id", [1, 2, '"three"']]
+                    }
+                }
+            },
+            [('DELETE FROM "test"\nWHERE "id" IN (1, 2, %s)', ['three'])]
+        ), (
+            {
+                "delete": {
+                    "table": "test",
+                    "where": {
+                        "and": [
+                            {"startswith": ["name", '"foo"']},
+                            {"icontains": ["email", "domain"]}
+                        ]
+                    }
+                }
+            },
+            [(
+                'DELETE FROM "test"\n'
+                'WHERE ("name" like %s) and '
+                '("email" ilike concat(\'%\', "domain", \'%\'))',
+                ['foo%']
+            )]
+        ), (
+            {
+                "delete": {
+                    "table": "test",
+                    "where": {
+                        "not": {
+                            "and": [
+                                {"=": ["id", 1]},
+                                {"or": [{"<": ["id", 2]}, {"not": "active"}]}
+                            ]
+                        }
+                    }
+                }
+            },
+            [(
+                'DELETE FROM "test"\n'
+                'WHERE not (("id" = 1) and (("id" < 2) or (not "active")))',
+                []
+            )]
         ), (
             {
                 "delete": "test"
@@ -362,6 +409,21 @@ def test_build_delete():
         assert expected == result
 
 
+def test_build_deeply_nested_where():
+    # deeper than the recursion limit
+    dialect = get_dialect()
+    where = {"=": ["id", 0]}
+    expected = '("id" = 0)'
+    for i in range(1, 3000):
+        where = {"or": [where, {"=": ["id", i]}]}
+        expected = f'{expected} or ("id" = {i})'
+        if i < 2999:
+            expected = f'({expected})'
+
+    result = build({"delete": {"table": "test", "where": where}}, dialect=dialect)
+    assert [(f'DELETE FROM "test"\nWHERE {expected}', [])] == result
+
+
 def test_build_update():
     dialect = get_dialect()
     expectations = [